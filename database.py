@@ -6,34 +6,135 @@ Provides functions for connecting to and interacting with the SQLite database.
 
 import sqlite3
 import os
+import atexit
+import queue
+import threading
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
-from receipt import Receipt, Item
+import schema
+from receipt import Receipt, Item, to_cents
+from queries import invalidate_cache
 
 
 # Default database path
 DEFAULT_DB_PATH = "rewe_receipts.db"
 
+# Connection settings applied on every connect
+_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",            # Enable foreign keys
+    "PRAGMA journal_mode = WAL;",           # Readers don't block the writer, fewer fsyncs
+    "PRAGMA synchronous = NORMAL;",         # Safe with WAL, no fsync per commit
+    "PRAGMA cache_size = -65536;",          # 64 MB page cache
+    "PRAGMA temp_store = MEMORY;",          # Temp tables and indices in memory
+    "PRAGMA busy_timeout = 5000;",          # Wait up to 5s on locks instead of failing
+    "PRAGMA mmap_size = 268435456;",        # Memory-map up to 256 MB of the file
+)
+
+
+def _configure(conn: sqlite3.Connection):
+    """Apply the default PRAGMA settings to a new connection."""
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+
+
+# Receipt rows per multi-row INSERT, keeps the bound parameters below SQLite's
+# historic limit of 999 (13 columns per row)
+_RECEIPTS_PER_INSERT = 76
+
+# Rows fetched per fetchmany() call
+_FETCH_SIZE = 512
+
+# Error messages kept by insert_receipts_batch when not verbose
+_MAX_ERROR_MESSAGES = 100
+
+# Tables used by ReceiptDatabase
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    id INTEGER PRIMARY KEY,
+    store_name TEXT,
+    address TEXT,
+    city TEXT,
+    uid_nr TEXT,
+    total_amount REAL,
+    change REAL,
+    payment_methode TEXT,
+    taxes REAL,
+    date TEXT,
+    time TEXT,
+    bon_nr TEXT,
+    amount_given REAL,
+    item_count INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    receipt_id INTEGER NOT NULL REFERENCES receipts(id) ON DELETE CASCADE,
+    name TEXT,
+    price_per_unit REAL,
+    quantity REAL,
+    total REAL,
+    date TEXT,
+    time TEXT
+);
+
+-- A receipt is identified by its date, time and bon number
+CREATE UNIQUE INDEX IF NOT EXISTS ux_receipts_dtb ON receipts(date, time, bon_nr);
+"""
+
+
+# Insert statements, built once so sqlite3's statement cache sees the same string
+_RECEIPT_COLUMNS = """
+    store_name, address, city, uid_nr, total_amount,
+    change, payment_methode, taxes, date, time, bon_nr, amount_given, item_count
+"""
+_RECEIPT_PLACEHOLDERS = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# Duplicates are skipped by the unique index and return no row
+_SQL_INS_RECEIPT = f"""
+INSERT OR IGNORE INTO receipts ({_RECEIPT_COLUMNS}) VALUES {_RECEIPT_PLACEHOLDERS}
+RETURNING id
+"""
+
+_SQL_INS_ITEM = """
+INSERT INTO items (
+    receipt_id, name, price_per_unit, quantity, total, date, time
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@lru_cache(maxsize=None)
+def _sql_ins_receipts(count: int) -> str:
+    """Build the multi-row receipts INSERT for a chunk of the given size."""
+    values = ", ".join([_RECEIPT_PLACEHOLDERS] * count)
+    return f"""
+INSERT OR IGNORE INTO receipts ({_RECEIPT_COLUMNS}) VALUES {values}
+RETURNING id, date, time, bon_nr
+"""
+
 
 @contextmanager
 def get_db_connection(db_path: str = DEFAULT_DB_PATH):
     """
     Context manager for database connections.
-    Automatically commits and closes the connection.
+    Runs the block in one transaction, commits and closes the connection.
 
     Usage:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM receipts")
     """
-    conn = sqlite3.connect(db_path)
+    # Transactions are managed explicitly instead of by the sqlite3 module
+    conn = sqlite3.connect(db_path, isolation_level=None)
     conn.row_factory = sqlite3.Row  # Enable column access by name
-    conn.execute("PRAGMA foreign_keys = ON;")  # Enable foreign keys
+    _configure(conn)
     try:
+        conn.execute("BEGIN")
         yield conn
-        conn.commit()
+        conn.execute("COMMIT")
     except Exception as e:
-        conn.rollback()
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
         raise e
     finally:
         conn.close()
@@ -53,13 +154,19 @@ class ReceiptDatabase:
 
     def connect(self):
         """Establish database connection."""
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.execute("PRAGMA foreign_keys = ON;")
+        # Transactions are managed explicitly instead of by the sqlite3 module
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row  # Enable column access by name
+        _configure(self.conn)
+        self.conn.executescript(_SCHEMA)
+        schema.ensure_indexes(self.conn, analyze=schema.migrate(self.conn))
         self.cursor = self.conn.cursor()
 
     def close(self):
         """Close database connection."""
         if self.conn:
+            # Refresh planner statistics for tables that changed a lot since ANALYZE
+            self.conn.execute("PRAGMA optimize")
             self.conn.close()
 
     def __enter__(self):
@@ -82,71 +189,161 @@ class ReceiptDatabase:
             tuple: (success: bool, message: str)
         """
         try:
-            # Check if receipt already exists
-            self.cursor.execute("""
-                SELECT id FROM receipts
-                WHERE date = ? AND time = ? AND bon_nr = ?
-            """, (receipt.date, receipt.time, receipt.bon_nr))
-
-            existing = self.cursor.fetchone()
-            if existing:
-                return (False, f"Receipt already exists (Date: {receipt.date}, Time: {receipt.time}, Bon: {receipt.bon_nr})")
-
-            # Insert receipt
-            self.cursor.execute("""
-                INSERT INTO receipts (
-                    store_name, address, city, uid_nr, total_amount,
-                    change, payment_methode, taxes, date, time, bon_nr, amount_given
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                receipt.store_name,
-                receipt.address,
-                receipt.city,
-                receipt.uid_nr,
-                receipt.total_amount,
-                receipt.change,
-                receipt.payment_methode,
-                receipt.taxes,
-                receipt.date,
-                receipt.time,
-                receipt.bon_nr,
-                receipt.amount_given
-            ))
-
-            receipt_id = self.cursor.lastrowid
-
-            # Insert items
-            for item in receipt.items:
-                self.cursor.execute("""
-                    INSERT INTO items (
-                        receipt_id, name, price_per_unit, quantity, total, date, time
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    receipt_id,
-                    item.name,
-                    item.price_per_unit,
-                    item.quantity,
-                    item.total,
-                    receipt.date,
-                    receipt.time
-                ))
-
-            self.conn.commit()
-            return (True, f"Successfully inserted receipt with {len(receipt.items)} items (ID: {receipt_id})")
-
-        except sqlite3.IntegrityError as e:
-            self.conn.rollback()
-            return (False, f"Database integrity error: {str(e)}")
+            self.cursor.execute("BEGIN IMMEDIATE")
+            result = self._insert_receipt(receipt)
+            self.cursor.execute("COMMIT")
+            if result[0]:
+                invalidate_cache()  # Cached statistics no longer match
+            return result
         except Exception as e:
-            self.conn.rollback()
-            return (False, f"Error inserting receipt: {str(e)}")
+            self._rollback()
+            return (False, self._error_message(e))
 
-    def insert_receipts_batch(self, receipts: List[Receipt]) -> dict:
+    def _rollback(self):
+        """Roll back the current transaction, if any."""
+        if self.conn.in_transaction:
+            self.cursor.execute("ROLLBACK")
+
+    def _insert_receipt(self, receipt: Receipt) -> tuple[bool, str]:
+        """
+        Insert a receipt and its items without committing.
+
+        Transaction handling is left to the caller. Database errors are raised.
+
+        Args:
+            receipt: Receipt object to insert
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        receipt_id = self._insert_receipt_row(receipt)
+        if receipt_id is None:
+            return (False, f"Receipt already exists (Date: {receipt.date}, Time: {receipt.time}, Bon: {receipt.bon_nr})")
+
+        self._insert_item_rows(self._item_rows(receipt_id, receipt))
+
+        return (True, f"Successfully inserted receipt with {len(receipt.items)} items (ID: {receipt_id})")
+
+    def _insert_receipt_row(self, receipt: Receipt) -> Optional[int]:
+        """
+        Insert the receipt row without its items.
+
+        Returns:
+            Database ID of the new receipt, or None if it already exists
+        """
+        self.cursor.execute(_SQL_INS_RECEIPT, receipt.to_rows()[0])
+
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _stored_key(receipt: Receipt) -> tuple:
+        """
+        Build the (date, time, bon_nr) key of a receipt as SQLite stores it.
+
+        The columns are TEXT, so e.g. an int bon_nr is stored as its string.
+        """
+        return tuple(None if value is None else str(value)
+                     for value in (receipt.date, receipt.time, receipt.bon_nr))
+
+    def _insert_receipt_rows(self, receipts: List[Receipt]) -> Optional[List[Optional[int]]]:
+        """
+        Insert several receipt rows with a single multi-row INSERT.
+
+        Returns:
+            Database ID of each new receipt in input order, None for duplicates.
+            None if the new rows can't be matched to the receipts, the caller
+            then has to roll back and insert the receipts one by one.
+        """
+        keys = [self._stored_key(receipt) for receipt in receipts]
+        # NULLs never collide in the unique index, so such keys can't identify a row
+        if any(None in key for key in keys):
+            return None
+
+        self.cursor.execute(_sql_ins_receipts(len(receipts)),
+                            [value for receipt in receipts for value in receipt.to_rows()[0]])
+
+        # RETURNING order is unspecified, so match the new rows by their unique key.
+        # A key that appears twice in the batch is only inserted for its first receipt.
+        new_rows = self.cursor.fetchall()
+        new_ids = {(date, time, bon_nr): receipt_id for receipt_id, date, time, bon_nr in new_rows}
+        receipt_ids = [new_ids.pop(key, None) for key in keys]
+
+        # Every new row must belong to exactly one receipt
+        if new_ids or len(new_rows) != sum(receipt_id is not None for receipt_id in receipt_ids):
+            return None
+        return receipt_ids
+
+    @staticmethod
+    def _item_rows(receipt_id: int, receipt: Receipt) -> List[tuple]:
+        """Build the items table rows for a new receipt."""
+        _, item_rows = receipt.to_rows()
+        return [(receipt_id, *row) for row in item_rows]
+
+    def _insert_item_rows(self, rows: List[tuple]):
+        """Insert item rows with one prepared statement reused for all rows."""
+        self.cursor.executemany(_SQL_INS_ITEM, rows)
+
+    def _insert_receipts_one_by_one(self, receipts: List[Receipt]) -> List[list]:
+        """
+        Insert each receipt row in its own savepoint.
+
+        Returns:
+            One [receipt_id, error] entry per receipt
+        """
+        results = []
+        for receipt in receipts:
+            self.cursor.execute("SAVEPOINT receipt")
+            try:
+                results.append([self._insert_receipt_row(receipt), None])
+            except Exception as e:
+                self.cursor.execute("ROLLBACK TO receipt")
+                results.append([None, self._error_message(e)])
+            self.cursor.execute("RELEASE receipt")
+        return results
+
+    def _insert_items_per_receipt(self, receipts: List[Receipt], results: List[list]):
+        """
+        Insert the items of each new receipt in its own savepoint.
+
+        Receipts whose items fail are deleted again and their result entry is
+        turned into an error.
+        """
+        for receipt, result in zip(receipts, results):
+            receipt_id = result[0]
+            if receipt_id is None:
+                continue
+
+            self.cursor.execute("SAVEPOINT receipt")
+            try:
+                self._insert_item_rows(self._item_rows(receipt_id, receipt))
+            except Exception as e:
+                self.cursor.execute("ROLLBACK TO receipt")
+                self.cursor.execute("DELETE FROM receipts WHERE id = ?", (receipt_id,))
+                result[:] = [None, self._error_message(e)]
+            self.cursor.execute("RELEASE receipt")
+
+    @staticmethod
+    def _error_message(error: Exception) -> str:
+        """Format an insert error as a status message."""
+        if isinstance(error, sqlite3.IntegrityError):
+            return f"Database integrity error: {str(error)}"
+        return f"Error inserting receipt: {str(error)}"
+
+    def insert_receipts_batch(self, receipts: List[Receipt], verbose: bool = False) -> dict:
         """
         Insert multiple receipts into the database.
 
+        All receipts are written in a single transaction. The receipt rows are
+        inserted first with multi-row INSERT ... RETURNING statements, then the
+        items of all new receipts with a single executemany(). If a statement
+        fails it is retried receipt by receipt, so a failing receipt is rolled
+        back without affecting the rest of the batch.
+
         Args:
             receipts: List of Receipt objects to insert
+            verbose: If True, add a message for every receipt. Otherwise only
+                the first error messages are kept.
 
         Returns:
             dict: Statistics about the insertion (success_count, duplicate_count, error_count, messages)
@@ -158,18 +355,61 @@ class ReceiptDatabase:
             'messages': []
         }
 
-        for i, receipt in enumerate(receipts, 1):
-            success, message = self.insert_receipt(receipt)
+        # One [receipt_id, error] entry per receipt, receipt_id is None for duplicates and errors
+        results = []
 
-            if success:
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Pass 1: receipt rows, several per INSERT statement
+            for start in range(0, len(receipts), _RECEIPTS_PER_INSERT):
+                chunk = receipts[start:start + _RECEIPTS_PER_INSERT]
+                self.cursor.execute("SAVEPOINT receipts")
+                try:
+                    receipt_ids = self._insert_receipt_rows(chunk)
+                except Exception:
+                    receipt_ids = None  # Retry receipt by receipt to find the failing ones
+                if receipt_ids is not None:
+                    results.extend([receipt_id, None] for receipt_id in receipt_ids)
+                else:
+                    # Single-row inserts return the id of each receipt directly
+                    self.cursor.execute("ROLLBACK TO receipts")
+                    results.extend(self._insert_receipts_one_by_one(chunk))
+                self.cursor.execute("RELEASE receipts")
+
+            # Pass 2: items of all new receipts at once
+            self.cursor.execute("SAVEPOINT items")
+            try:
+                self._insert_item_rows([row
+                                        for receipt, (receipt_id, _) in zip(receipts, results)
+                                        if receipt_id is not None
+                                        for row in self._item_rows(receipt_id, receipt)])
+            except Exception:
+                # Retry receipt by receipt to find the failing ones
+                self.cursor.execute("ROLLBACK TO items")
+                self._insert_items_per_receipt(receipts, results)
+            self.cursor.execute("RELEASE items")
+
+            self.cursor.execute("COMMIT")
+        except Exception:
+            self._rollback()
+            raise
+
+        for i, (receipt, (receipt_id, error)) in enumerate(zip(receipts, results), 1):
+            if receipt_id is not None:
                 stats['success_count'] += 1
-                stats['messages'].append(f"[{i}/{len(receipts)}] ✓ {message}")
-            elif "already exists" in message:
+                if verbose:
+                    stats['messages'].append(f"[{i}/{len(receipts)}] ✓ Successfully inserted receipt with {len(receipt.items)} items (ID: {receipt_id})")
+            elif error is None:
                 stats['duplicate_count'] += 1
-                stats['messages'].append(f"[{i}/{len(receipts)}] ⊗ Skipped duplicate: {receipt.date} {receipt.time} Bon:{receipt.bon_nr}")
+                if verbose:
+                    stats['messages'].append(f"[{i}/{len(receipts)}] ⊗ Skipped duplicate: {receipt.date} {receipt.time} Bon:{receipt.bon_nr}")
             else:
                 stats['error_count'] += 1
-                stats['messages'].append(f"[{i}/{len(receipts)}] ✗ {message}")
+                if verbose or stats['error_count'] <= _MAX_ERROR_MESSAGES:
+                    stats['messages'].append(f"[{i}/{len(receipts)}] ✗ {error}")
+
+        if stats['success_count']:
+            invalidate_cache()  # Cached statistics no longer match
 
         return stats
 
@@ -199,24 +439,30 @@ class ReceiptDatabase:
             FROM items WHERE receipt_id = ?
         """, (receipt_id,))
 
-        items = [Item(name=item[0], price_per_unit=item[1], quantity=item[2], total=item[3])
-                 for item in self.cursor.fetchall()]
-
-        return Receipt(
-            store_name=row[0],
-            address=row[1],
-            city=row[2],
-            uid_nr=row[3],
-            total_amount=row[4],
-            change=row[5],
-            payment_methode=row[6],
-            taxes=row[7],
-            date=row[8],
-            time=row[9],
-            bon_nr=row[10],
-            amount_given=row[11],
-            items=items
-        )
+        items = []
+        while True:
+            rows = self.cursor.fetchmany(_FETCH_SIZE)
+            if not rows:
+                break
+            items.extend(Item(name=item['name'],
+                              price_per_unit=to_cents(item['price_per_unit']),
+                              quantity=item['quantity'],
+                              total=to_cents(item['total']))
+                         for item in rows)
+
+        return Receipt(store_name=row['store_name'],
+                       address=row['address'],
+                       city=row['city'],
+                       uid_nr=row['uid_nr'],
+                       items=items,
+                       total_amount=to_cents(row['total_amount']),
+                       change=to_cents(row['change']),
+                       payment_methode=row['payment_methode'],
+                       taxes=to_cents(row['taxes']),
+                       date=row['date'],
+                       time=row['time'],
+                       bon_nr=row['bon_nr'],
+                       amount_given=to_cents(row['amount_given']))
 
     def get_all_receipts(self) -> List[Receipt]:
         """
@@ -225,40 +471,207 @@ class ReceiptDatabase:
         Returns:
             List of Receipt objects
         """
-        self.cursor.execute("SELECT id FROM receipts ORDER BY date DESC, time DESC")
-        receipt_ids = [row[0] for row in self.cursor.fetchall()]
+        self.cursor.execute("""
+            SELECT id, store_name, address, city, uid_nr, total_amount,
+                   change, payment_methode, taxes, date, time, bon_nr, amount_given
+            FROM receipts ORDER BY date DESC, time DESC
+        """)
+
+        receipts = {}
+        for row in self.cursor.fetchall():
+            receipts[row[0]] = Receipt(
+                store_name=row[1],
+                address=row[2],
+                city=row[3],
+                uid_nr=row[4],
+                total_amount=to_cents(row[5]),
+                change=to_cents(row[6]),
+                payment_methode=row[7],
+                taxes=to_cents(row[8]),
+                date=row[9],
+                time=row[10],
+                bon_nr=row[11],
+                amount_given=to_cents(row[12])
+            )
+
+        # Get the items of all receipts in one query
+        self.cursor.execute("""
+            SELECT receipt_id, name, price_per_unit, quantity, total
+            FROM items ORDER BY receipt_id, id
+        """)
+
+        for item in self.cursor.fetchall():
+            receipt = receipts.get(item[0])
+            if receipt is not None:
+                receipt.items.append(Item(name=item[1], price_per_unit=to_cents(item[2]),
+                                          quantity=item[3], total=to_cents(item[4])))
+
+        return list(receipts.values())
+
+
+# Open ReceiptDatabase instances by database path, see _get_shared_db()
+_shared_dbs: Dict[str, 'ReceiptDatabase'] = {}
+
+
+def _get_shared_db(db_path: str = DEFAULT_DB_PATH) -> 'ReceiptDatabase':
+    """
+    Get a connected ReceiptDatabase that is reused across calls.
+
+    The connection is opened on first use and closed when the interpreter
+    exits. Like any sqlite3 connection it must only be used from the thread
+    that created it.
+
+    Args:
+        db_path: Path to SQLite database file
 
-        return [self.get_receipt_by_id(rid) for rid in receipt_ids]
+    Returns:
+        Connected ReceiptDatabase for db_path
+    """
+    db = _shared_dbs.get(db_path)
+    if db is None:
+        db = ReceiptDatabase(db_path)
+        db.connect()
+        atexit.register(db.close)
+        _shared_dbs[db_path] = db
+    return db
 
 
-def save_receipts_to_database(receipts: List[Receipt], db_path: str = DEFAULT_DB_PATH) -> dict:
+def save_receipts_to_database(receipts: List[Receipt], db_path: str = DEFAULT_DB_PATH,
+                              verbose: bool = False) -> dict:
     """
     Save a list of receipts to the database.
 
     Args:
         receipts: List of Receipt objects to save
         db_path: Path to SQLite database file
+        verbose: If True, print a result line for every receipt, otherwise only errors
 
     Returns:
         dict: Statistics about the save operation
     """
-    with ReceiptDatabase(db_path) as db:
-        stats = db.insert_receipts_batch(receipts)
+    db = _get_shared_db(db_path)
+    stats = db.insert_receipts_batch(receipts, verbose=verbose)
+
+    print_upload_summary(len(receipts), stats, verbose)
+
+    return stats
+
+
+def print_upload_summary(receipt_count: int, stats: dict, verbose: bool = False):
+    """
+    Print the statistics of a database upload.
 
-    # Print summary
+    Args:
+        receipt_count: Number of receipts processed
+        stats: Statistics as returned by insert_receipts_batch
+        verbose: If True, the messages contain a line for every receipt, otherwise only errors
+    """
     print("\n" + "=" * 60)
     print("DATABASE UPLOAD SUMMARY")
     print("=" * 60)
-    print(f"Total receipts processed: {len(receipts)}")
+    print(f"Total receipts processed: {receipt_count}")
     print(f"Successfully inserted:    {stats['success_count']}")
     print(f"Duplicates skipped:       {stats['duplicate_count']}")
     print(f"Errors:                   {stats['error_count']}")
     print("=" * 60)
 
     if stats['messages']:
-        print("\nDetailed Results:")
+        print("\nDetailed Results:" if verbose else "\nErrors:")
         for msg in stats['messages']:
             print(msg)
         print("=" * 60)
 
-    return stats
+
+class ReceiptWriter:
+    """
+    Write receipts to the database from a background thread.
+
+    Receipts passed to put() are queued and inserted in batches, each batch in
+    a single transaction. All SQLite writes happen on the writer thread, which
+    opens its own connection.
+
+    Usage:
+        writer = ReceiptWriter()
+        writer.start()
+        writer.put(receipt)
+        stats = writer.close()
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, batch_size: int = 100, verbose: bool = False):
+        """
+        Initialize the writer.
+
+        Args:
+            db_path: Path to SQLite database file
+            batch_size: Number of receipts inserted per transaction
+            verbose: If True, keep a message for every receipt, otherwise only errors
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.stats = {
+            'success_count': 0,
+            'duplicate_count': 0,
+            'error_count': 0,
+            'messages': []
+        }
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ReceiptWriter", daemon=True)
+        self._error = None
+
+    def start(self):
+        """Start the writer thread."""
+        self._thread.start()
+
+    def put(self, receipt: Receipt):
+        """Queue a receipt for insertion. Safe to call from any thread."""
+        self._queue.put(receipt)
+
+    def put_error(self, message: str):
+        """Count a receipt that could not be parsed as failed. Safe to call from any thread."""
+        self._queue.put(message)
+
+    def close(self) -> dict:
+        """
+        Insert the remaining receipts and stop the writer thread.
+
+        Returns:
+            dict: Statistics about all insertions (success_count, duplicate_count, error_count, messages)
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.stats
+
+    def _run(self):
+        """Drain the queue in batches until close() is called."""
+        try:
+            with ReceiptDatabase(self.db_path) as db:
+                batch = []
+                while True:
+                    receipt = self._queue.get()
+                    if isinstance(receipt, str):
+                        # Failed before reaching the writer, see put_error()
+                        self._add_stats({'success_count': 0, 'duplicate_count': 0, 'error_count': 1,
+                                         'messages': [f"✗ {receipt}"]})
+                        continue
+                    if receipt is not None:
+                        batch.append(receipt)
+                    if batch and (receipt is None or len(batch) >= self.batch_size):
+                        self._add_stats(db.insert_receipts_batch(batch, verbose=self.verbose))
+                        batch = []
+                    if receipt is None:
+                        break
+        except Exception as e:
+            self._error = e
+
+    def _add_stats(self, batch_stats: dict):
+        """Add the statistics of one batch to the totals."""
+        for key in ('success_count', 'duplicate_count', 'error_count'):
+            self.stats[key] += batch_stats[key]
+
+        messages = batch_stats['messages']
+        if not self.verbose:
+            messages = messages[:max(0, _MAX_ERROR_MESSAGES - len(self.stats['messages']))]
+        self.stats['messages'].extend(messages)
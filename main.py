@@ -1,19 +1,34 @@
 import os
+import re
 import argparse
 import json
 import imaplib
 import email
+import itertools
+import collections
+from concurrent.futures import ProcessPoolExecutor
 from email.header import decode_header
-from io import BytesIO
-from pypdf import PdfReader
+import pypdfium2 as pdfium
 
 from receipt import Receipt
-from database import save_receipts_to_database
+from database import ReceiptWriter, print_upload_summary
 
 from dotenv import load_dotenv
 load_dotenv()  # This loads the .env file
 
-receipts = list()
+# Number of emails fetched per IMAP FETCH command
+FETCH_BATCH_SIZE = 50
+
+# Folder name at the end of an IMAP LIST line: b'(\\HasNoChildren) "/" "FolderName"'
+FOLDER_RE = re.compile(rb'"([^"]+)"$')
+# Folder holding the REWE receipt emails
+REWE_RE = re.compile(r'rewe', re.IGNORECASE)
+
+# Tokens of an IMAP FETCH response: parentheses, quoted strings, literal markers and atoms
+IMAP_TOKEN_RE = re.compile(rb'([()])|"((?:[^"\\]|\\.)*)"|(\{\d+\}$)|([^\s()"]+)')
+# Message number and body section in the header of a FETCH response literal
+FETCH_ID_RE = re.compile(rb'^(\d+) \(')
+BODY_SECTION_RE = re.compile(rb'BODY\[([^\]]*)\]')
 
 def get_config():
     """
@@ -85,12 +100,10 @@ def list_folders(imap):
     folder_list = []
 
     for folder in folders:
-        # Decode folder name
-        folder_str = folder.decode()
-        # Extract folder name (format: '(\\HasNoChildren) "/" "FolderName"')
-        parts = folder_str.split('"')
-        if len(parts) >= 3:
-            folder_name = parts[-2]
+        # Extract and decode folder name
+        match = FOLDER_RE.search(folder)
+        if match:
+            folder_name = match.group(1).decode()
             folder_list.append(folder_name)
             print(f"  - {folder_name}")
 
@@ -107,30 +120,258 @@ def extract_text_from_pdf(pdf_bytes):
         Extracted text as string
     """
     try:
-        pdf_file = BytesIO(pdf_bytes)
-        reader = PdfReader(pdf_file)
+        pdf = pdfium.PdfDocument(pdf_bytes)
 
-        text = ""
-        for page_num, page in enumerate(reader.pages, 1):
-            page_text = page.extract_text()
-            text += f"\n--- Page {page_num} ---\n{page_text}\n"
+        pages = []
+        for page_num, page in enumerate(pdf, 1):
+            # PDFium separates lines with \r\n
+            page_text = page.get_textpage().get_text_range().replace('\r\n', '\n')
+            pages.append(f"--- Page {page_num} ---\n{page_text}")
 
-        return text.strip()
+        return "\n\n".join(pages).strip()
     except Exception as e:
         return f"Error extracting text: {e}"
 
-def download_pdf_attachments(imap, folder_name="REWE", save_to_disk=False):
+def _store_extracted_text(receipt_data, writer, future):
+    """
+    Store the text of a finished PDF extraction and queue the parsed receipt.
+
+    Runs on the main thread. Receipts whose extraction or parsing fails are
+    counted as errors by the writer.
+
+    Args:
+        receipt_data: Receipt dict to store the text in
+        writer: ReceiptWriter to queue the parsed receipt on, or None
+        future: Extraction future, waited for if it has not finished yet
+    """
+    try:
+        receipt_data['extracted_text'] = future.result()  # Extracted text
+    except Exception as e:
+        receipt_data['extracted_text'] = f"Error extracting text: {e}"
+        if writer is not None:
+            writer.put_error(f"{receipt_data['filename']}: {receipt_data['extracted_text']}")
+        return
+
+    if writer is None:
+        return
+
+    try:
+        receipt = Receipt.from_text(receipt_data['extracted_text'])
+    except Exception as e:
+        writer.put_error(f"{receipt_data['filename']}: Could not parse receipt: {e}")
+        return
+    writer.put(receipt)
+
+def fetch_emails(imap, email_ids, batch_size=FETCH_BATCH_SIZE):
+    """
+    Fetch full emails, several per IMAP FETCH command.
+
+    Uses BODY.PEEK[] so the emails are not marked as read.
+
+    Args:
+        imap: IMAP connection object with a selected folder
+        email_ids: List of message sequence numbers as bytes
+        batch_size: Number of emails per FETCH command
+
+    Yields:
+        Tuples of (email_id, raw email bytes)
+    """
+    for start in range(0, len(email_ids), batch_size):
+        batch = email_ids[start:start + batch_size]
+        _, msg_data = imap.fetch(b','.join(batch), '(BODY.PEEK[])')
+
+        # The response interleaves (b'<id> (BODY[] {<size>}', <body>) tuples with b')' terminators
+        for response in msg_data:
+            if isinstance(response, tuple):
+                email_id = response[0].split(None, 1)[0]
+                yield email_id, response[1]
+
+def parse_fetch_response(msg_data):
+    """
+    Parse an IMAP FETCH response into nested lists.
+
+    Quoted strings and literals become bytes, NIL becomes None.
+
+    Args:
+        msg_data: Response data as returned by imap.fetch()
+
+    Returns:
+        Dict mapping email_id to a dict of fetched items, e.g. {b'BODYSTRUCTURE': [...]}
+    """
+    tokens = []
+    for response in msg_data:
+        head, literal = response if isinstance(response, tuple) else (response, None)
+        for paren, quoted, literal_marker, atom in IMAP_TOKEN_RE.findall(head):
+            if paren:
+                tokens.append(paren)
+            elif literal_marker:
+                tokens.append([literal])
+            elif atom:
+                tokens.append(None if atom.upper() == b'NIL' else [atom])
+            else:
+                tokens.append([re.sub(rb'\\(.)', rb'\1', quoted)])
+
+    # Atoms and strings are wrapped in a list above to tell them apart from parentheses
+    stack = [[]]
+    for token in tokens:
+        if token == b'(':
+            stack.append([])
+        elif token == b')':
+            if len(stack) > 1:
+                closed = stack.pop()
+                stack[-1].append(closed)
+        else:
+            stack[-1].append(token[0] if isinstance(token, list) else token)
+
+    fetched = {}
+    top = stack[0]
+    for email_id, items in zip(top[::2], top[1::2]):
+        if isinstance(items, list):
+            fetched.setdefault(email_id, {}).update(
+                (name.upper(), value) for name, value in zip(items[::2], items[1::2]) if isinstance(name, bytes))
+    return fetched
+
+def _iter_body_parts(body, section=''):
+    """
+    Yield (section, part) for every non-multipart part of a parsed BODYSTRUCTURE.
+    """
+    if isinstance(body[0], list):
+        # Multipart: nested parts come first, followed by the subtype and extension data
+        for number, child in enumerate(itertools.takewhile(lambda p: isinstance(p, list), body), 1):
+            yield from _iter_body_parts(child, f"{section}.{number}" if section else str(number))
+        return
+
+    section = section or '1'
+    yield section, body
+
+    # Attached emails carry their own body structure
+    if (body[0] or b'').lower() == b'message' and (body[1] or b'').lower() == b'rfc822':
+        inner = body[8]
+        yield from _iter_body_parts(inner, section if isinstance(inner[0], list) else f"{section}.1")
+
+def find_pdf_sections(body):
+    """
+    Find the body sections of an email that contain a PDF attachment.
+
+    Args:
+        body: Parsed BODYSTRUCTURE of the email
+
+    Returns:
+        List of section numbers, or None if the whole email body is a PDF
+    """
+    sections = []
+    for section, part in _iter_body_parts(body):
+        if (part[0] or b'').lower() == b'application' and (part[1] or b'').lower() == b'pdf':
+            sections.append(section)
+
+    # A single-part email has no MIME header for its body part
+    if sections and not isinstance(body[0], list):
+        return None
+    return sections
+
+def fetch_pdf_sections(imap, email_ids, batch_size=FETCH_BATCH_SIZE):
+    """
+    Look up the PDF attachment sections of emails via BODYSTRUCTURE.
+
+    Args:
+        imap: IMAP connection object with a selected folder
+        email_ids: List of message sequence numbers as bytes
+        batch_size: Number of emails per FETCH command
+
+    Returns:
+        tuple: (dict mapping email_id to its PDF sections,
+                list of email_ids whose structure could not be used and need a full fetch)
+    """
+    pdf_sections = {}
+    full_fetch_ids = []
+
+    for start in range(0, len(email_ids), batch_size):
+        batch = email_ids[start:start + batch_size]
+        _, msg_data = imap.fetch(b','.join(batch), '(BODYSTRUCTURE)')
+        fetched = parse_fetch_response(msg_data)
+
+        for email_id in batch:
+            try:
+                sections = find_pdf_sections(fetched[email_id][b'BODYSTRUCTURE'])
+            except (KeyError, IndexError, TypeError, AttributeError):
+                sections = None
+
+            if sections is None:
+                full_fetch_ids.append(email_id)
+            elif sections:
+                pdf_sections[email_id] = tuple(sections)
+
+    return pdf_sections, full_fetch_ids
+
+def fetch_pdf_parts(imap, pdf_sections, batch_size=FETCH_BATCH_SIZE):
+    """
+    Fetch the subject and date headers and the PDF parts of emails.
+
+    Emails with the same attachment layout are fetched together, several per
+    IMAP FETCH command. Uses BODY.PEEK so the emails are not marked as read.
+
+    Args:
+        imap: IMAP connection object with a selected folder
+        pdf_sections: Dict mapping email_id to its PDF sections
+        batch_size: Number of emails per FETCH command
+
+    Yields:
+        Tuples of (email_id, header message, list of MIME part messages)
+    """
+    by_layout = {}
+    for email_id, sections in pdf_sections.items():
+        by_layout.setdefault(sections, []).append(email_id)
+
+    for sections, email_ids in by_layout.items():
+        items = ' '.join(['BODY.PEEK[HEADER.FIELDS (SUBJECT DATE)]'] +
+                         [f'BODY.PEEK[{section}.MIME] BODY.PEEK[{section}]' for section in sections])
+
+        for start in range(0, len(email_ids), batch_size):
+            batch = email_ids[start:start + batch_size]
+            _, msg_data = imap.fetch(b','.join(batch), f'({items})')
+
+            # Each literal comes as a (b'<id> (BODY[<section>] {<size>}', <data>) tuple,
+            # later literals of the same email omit the id
+            fetched = {}
+            current = None
+            for response in msg_data:
+                if not isinstance(response, tuple):
+                    continue
+                head, data = response
+                id_match = FETCH_ID_RE.match(head)
+                if id_match:
+                    current = fetched.setdefault(id_match.group(1), {})
+                section_match = BODY_SECTION_RE.search(head)
+                if current is not None and section_match:
+                    section = section_match.group(1).decode().upper()
+                    current['HEADER' if section.startswith('HEADER') else section] = data
+
+            for email_id in batch:
+                parts = fetched.get(email_id, {})
+                yield (email_id,
+                       email.message_from_bytes(parts.get('HEADER', b'')),
+                       [email.message_from_bytes(parts.get(f'{section}.MIME', b'') + parts[section])
+                        for section in sections if section in parts])
+
+def download_pdf_attachments(imap, folder_name="REWE", save_to_disk=False, writer=None):
     """
     Process PDF attachments from emails in a specific folder.
-    Keeps PDFs in memory and extracts text content.
+    Downloads only the PDF parts where possible and extracts their text.
+
+    Each PDF is passed to a worker process for text extraction while further
+    emails are downloaded, its bytes are not kept. If a writer is given, each
+    receipt is parsed on the main thread once its text is available and queued
+    for saving to the database.
 
     Args:
         imap: IMAP connection object
         folder_name: Folder name to process
-        save_to_disk: If True, also saves PDFs to receipts/ directory
+        save_to_disk: Unused, PDFs are never written to disk
+        writer: Optional ReceiptWriter that receives the parsed receipts
 
     Returns:
-        List of dicts containing PDF data and extracted text
+        List of dicts with filename, subject, date, email_id and extracted_text
+        for each PDF, empty if the folder could not be selected
     """
     # Select the folder
     print(f"\nSelecting folder: {folder_name}")
@@ -149,60 +390,72 @@ def download_pdf_attachments(imap, folder_name="REWE", save_to_disk=False):
 
     print(f"Processing {len(email_ids)} emails...")
 
-    for i, email_id in enumerate(email_ids, 1):
-        # Fetch the email
-        _, msg_data = imap.fetch(email_id, '(RFC822)')
-
-        # Parse the email
-        email_body = msg_data[0][1]
-        email_message = email.message_from_bytes(email_body)
-
-        # Get email subject
-        subject = email_message.get('Subject', 'No Subject')
-        if subject:
-            subject, encoding = decode_header(subject)[0]
-            if isinstance(subject, bytes):
-                subject = subject.decode(encoding if encoding else 'utf-8')
-
-        # Get email date
-        date = email_message.get('Date', 'unknown')
-
-        # Look for attachments
-        for part in email_message.walk():
-            # Check if this part is an attachment
-            if part.get_content_maintype() == 'multipart':
-                continue
-            if part.get('Content-Disposition') is None:
-                continue
-
-            filename = part.get_filename()
-
-            if filename:
-                # Decode filename if needed
-                filename_decoded, encoding = decode_header(filename)[0]
-                if isinstance(filename_decoded, bytes):
-                    filename_decoded = filename_decoded.decode(encoding if encoding else 'utf-8')
-
-                # Check if it's a PDF
-                if filename_decoded.lower().endswith('.pdf'):
-                    # Get PDF bytes (keep in memory)
-                    pdf_bytes = part.get_payload(decode=True)
-
-                    # Extract text from PDF
-                    extracted_text = extract_text_from_pdf(pdf_bytes)
-
-                    # Store receipt data in memory
+    # Only download the attachment parts of emails that contain PDFs,
+    # emails with an unusable BODYSTRUCTURE are downloaded completely
+    pdf_sections, full_fetch_ids = fetch_pdf_sections(imap, email_ids)
+    print(f"Emails with PDF attachments: {len(pdf_sections)}")
+    if full_fetch_ids:
+        print(f"Emails downloaded completely: {len(full_fetch_ids)}")
+
+    full_emails = ((email_id, email_message, email_message.walk())
+                   for email_id, email_body in fetch_emails(imap, full_fetch_ids)
+                   for email_message in [email.message_from_bytes(email_body)])
+
+    receipts = []
+
+    # Submitted extractions whose text has not been stored yet, in email order
+    pending = collections.deque()
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        for email_id, email_message, parts in itertools.chain(fetch_pdf_parts(imap, pdf_sections), full_emails):
+            # Get email subject
+            subject = email_message.get('Subject', 'No Subject')
+            if subject:
+                subject, encoding = decode_header(subject)[0]
+                if isinstance(subject, bytes):
+                    subject = subject.decode(encoding if encoding else 'utf-8')
+
+            # Get email date
+            date = email_message.get('Date', 'unknown')
+
+            # Look for attachments
+            for part in parts:
+                # Check if this part is a PDF attachment
+                if part.get_content_type() != 'application/pdf':
+                    continue
+                if part.get('Content-Disposition') is None:
+                    continue
+
+                filename = part.get_filename()
+
+                if filename:
+                    # Decode filename if needed
+                    filename_decoded, encoding = decode_header(filename)[0]
+                    if isinstance(filename_decoded, bytes):
+                        filename_decoded = filename_decoded.decode(encoding if encoding else 'utf-8')
+
+                    # Store receipt data in memory, the PDF bytes only go to the worker
                     receipt_data = {
                         'filename': filename_decoded,
                         'subject': subject,
                         'date': date,
                         'email_id': email_id.decode(),
-                        'pdf_bytes': pdf_bytes,  # Raw PDF data
-                        'extracted_text': extracted_text,  # Extracted text
                         }
 
                     receipts.append(receipt_data)
 
+                    # Extract text from PDF in a worker process
+                    pending.append((receipt_data, pool.submit(extract_text_from_pdf, part.get_payload(decode=True))))
+
+            # Parse the finished extractions while further emails are downloaded
+            while pending and pending[0][1].done():
+                receipt_data, future = pending.popleft()
+                _store_extracted_text(receipt_data, writer, future)
+
+        # Wait for the remaining extractions
+        for receipt_data, future in pending:
+            _store_extracted_text(receipt_data, writer, future)
+
     return receipts
 
 def analyze_emails(username, password, server, port):
@@ -228,11 +481,7 @@ def analyze_emails(username, password, server, port):
         folders = list_folders(imap)
 
         # Check if REWE folder exists
-        rewe_folder = None
-        for folder in folders:
-            if 'rewe' in folder.lower():
-                rewe_folder = folder
-                break
+        rewe_folder = next((folder for folder in folders if REWE_RE.search(folder)), None)
 
         if not rewe_folder:
             print("\nWarning: No folder with 'REWE' in the name found.")
@@ -246,14 +495,14 @@ def analyze_emails(username, password, server, port):
 
         # Process PDF attachments from REWE folder (keep in memory)
         print(f"\nFound REWE folder: {rewe_folder}")
-        receipts = download_pdf_attachments(imap, folder_name=rewe_folder, save_to_disk=False)
-
-        analyzed_receipts = []
-        for raw_receipt in receipts:
-            analyzed_receipts.append(Receipt.from_text(raw_receipt['extracted_text']))
-
-        # Save receipts to database
-        db_stats = save_receipts_to_database(analyzed_receipts)
+        # Receipts are parsed and saved to the database while further PDFs are downloaded
+        writer = ReceiptWriter()
+        writer.start()
+        try:
+            receipts = download_pdf_attachments(imap, folder_name=rewe_folder, save_to_disk=False, writer=writer)
+        finally:
+            db_stats = writer.close()
+        print_upload_summary(len(receipts), db_stats)
 
         # Logout
         imap.logout()
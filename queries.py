@@ -2,84 +2,274 @@
 Analytics and Query Module for REWE Receipt Data
 
 Provides various statistical queries and reports for analyzing shopping patterns.
-This module is completely standalone and only requires the database file.
+This module only reads the database file, its schema and indexes are set up by
+the database module when receipts are imported.
 """
 
+import sys
 import sqlite3
-from typing import List, Dict, Any
+import json
+import time
+import atexit
+import threading
+import inspect
+import functools
+from pathlib import Path
+from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
 
 
 # Default database path
 DEFAULT_DB_PATH = "rewe_receipts.db"
 
+# Connection settings applied on every connect
+_PRAGMAS = (
+    "PRAGMA temp_store = MEMORY;",          # Sorting and grouping B-trees in memory
+    "PRAGMA mmap_size = 268435456;",        # Memory-map up to 256 MB of the file
+    "PRAGMA cache_size = -65536;",          # 64 MB page cache
+)
+
+
+# Per-thread open connections by (db_path, readonly), see get_db_connection()
+_local = threading.local()
+
+# Connections of all threads not closed yet, closed at interpreter exit
+_open_connections = set()
+_open_connections_lock = threading.Lock()
+
+
+def _configure(conn: sqlite3.Connection):
+    """Apply the default PRAGMA settings to a new connection."""
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+
+
+# Cached query results, see memoize_ttl()
+_cache: Dict[tuple, tuple] = {}
+
+# Part of every cache key, bumped by invalidate_cache()
+_cache_version = 0
+
+
+def invalidate_cache():
+    """Drop all cached query results, e.g. after new receipts were inserted."""
+    global _cache_version
+    _cache_version += 1
+    _cache.clear()
+
+
+def memoize_ttl(seconds: float = 60):
+    """
+    Cache a query function's result per arguments for a limited time.
+
+    Results are shared between callers and must not be modified.
+
+    Args:
+        seconds: How long a cached result stays valid
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Bind defaults so f(path) and f(db_path=path) share an entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            bound.arguments.pop('conn', None)  # Same data whichever connection reads it
+            key = (func.__name__, _cache_version, tuple(bound.arguments.items()))
+
+            now = time.monotonic()
+            entry = _cache.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+            value = func(*args, **kwargs)
+            _cache[key] = (value, now + seconds)
+            return value
+
+        return wrapper
+    return decorator
+
+
+def _connect(db_path: str, readonly: bool) -> sqlite3.Connection:
+    """Open and configure a new connection, see close_connections()."""
+    # Only the creating thread uses it, but _close_all() closes it from the main thread
+    if readonly:
+        conn = sqlite3.connect(Path(db_path).absolute().as_uri() + "?mode=ro", uri=True,
+                               check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    _configure(conn)
+    if readonly:
+        conn.execute("PRAGMA query_only = 1;")
+    with _open_connections_lock:
+        _open_connections.add(conn)
+    return conn
+
+
+def close_connections():
+    """
+    Close the connections the calling thread opened with get_db_connection().
+
+    Threads that stop before the interpreter exits should call this, their
+    connections are otherwise only closed at exit.
+    """
+    connections = getattr(_local, 'connections', None)
+    if not connections:
+        return
+
+    with _open_connections_lock:
+        _open_connections.difference_update(connections.values())
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+@atexit.register
+def _close_all():
+    """Close the connections of all threads at interpreter exit."""
+    # PRAGMA optimize is run by the writer, see ReceiptDatabase.close()
+    with _open_connections_lock:
+        for conn in _open_connections:
+            conn.close()
+        _open_connections.clear()
+
 
 @contextmanager
-def get_db_connection(db_path: str = DEFAULT_DB_PATH):
+def get_db_connection(db_path: str = DEFAULT_DB_PATH, readonly: bool = False):
     """
     Context manager for database connections.
-    Automatically commits and closes the connection.
+
+    Each thread reuses one open connection per database and mode. The
+    connection stays open after the with block, until the thread calls
+    close_connections() or the interpreter exits. Writable connections commit
+    on success and roll back on errors, read-only ones have nothing to commit.
+
+    Args:
+        db_path: Path to SQLite database file
+        readonly: Open the database read-only, as all queries in this module do
     """
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    try:
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get((db_path, readonly))
+    if conn is None:
+        conn = connections[(db_path, readonly)] = _connect(db_path, readonly)
+
+    if readonly:
         yield conn
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+    else:
+        with conn:
+            yield conn
+
+
+def _write_lines(lines: List[str]):
+    """Write report lines to stdout with a single write call."""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+@contextmanager
+def _use_connection(db_path: str, conn: Optional[sqlite3.Connection]):
+    """Yield conn if given, otherwise a new connection to db_path."""
+    if conn is not None:
+        yield conn
+    else:
+        with get_db_connection(db_path, readonly=True) as conn:
+            yield conn
+
+
+# Top items by purchase count, read from the item_stats summary table
+_TOP_ITEMS_CTE = """
+top_items AS (
+    SELECT
+        name,
+        purchase_count,
+        total_quantity,
+        total_spent,
+        ROUND(price_sum / purchase_count, 2) as avg_price_per_unit,
+        ROUND(min_price, 2) as min_price,
+        ROUND(max_price, 2) as max_price
+    FROM item_stats
+    ORDER BY purchase_count DESC, total_spent DESC
+    LIMIT :top_items
+)
+"""
+
+# The top items and their totals as one JSON object, built in a single query.
+# json_group_array() does not keep the CTE's ORDER BY, the items are sorted after loading
+_ITEM_STATISTICS_SQL = f"""
+WITH {_TOP_ITEMS_CTE}
+SELECT json_object(
+    'items', json((
+        SELECT json_group_array(json_object(
+            'name', name,
+            'purchase_count', purchase_count,
+            'total_quantity', total_quantity,
+            'total_spent', total_spent,
+            'avg_price_per_unit', avg_price_per_unit,
+            'min_price', min_price,
+            'max_price', max_price
+        ))
+        FROM top_items
+    )),
+    'total_purchases', COALESCE(SUM(purchase_count), 0),
+    'total_spent', COALESCE(SUM(total_spent), 0)
+)
+FROM top_items
+"""
+
+
+@memoize_ttl(seconds=60)
+def _get_item_statistics(db_path: str, limit: int,
+                         conn: Optional[sqlite3.Connection] = None) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Get the most purchased items together with their totals.
 
+    Returns:
+        tuple: (items, totals) where totals has total_purchases and total_spent
+    """
+    with _use_connection(db_path, conn) as conn:
+        cursor = conn.cursor()
+        # SQLite builds the whole result as one JSON value, json.loads turns it into dicts in C
+        cursor.execute(_ITEM_STATISTICS_SQL, {'top_items': limit})
+        statistics = json.loads(cursor.fetchone()[0])
+
+    items = statistics.pop('items')
+    items.sort(key=lambda item: (item['purchase_count'], item['total_spent']), reverse=True)
+    return items, statistics
 
-def get_most_purchased_items(db_path: str = DEFAULT_DB_PATH, limit: int = 20) -> List[Dict[str, Any]]:
+
+def get_most_purchased_items(db_path: str = DEFAULT_DB_PATH, limit: int = 20, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
     """
     Get the most frequently purchased items.
 
     Args:
         db_path: Path to SQLite database file
         limit: Number of top items to return
+        conn: Open connection to reuse instead of connecting to db_path
 
     Returns:
         List of dictionaries with item statistics
     """
-    with get_db_connection(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                name,
-                COUNT(*) as purchase_count,
-                SUM(quantity) as total_quantity,
-                SUM(total) as total_spent,
-                ROUND(AVG(price_per_unit), 2) as avg_price_per_unit,
-                ROUND(MIN(price_per_unit), 2) as min_price,
-                ROUND(MAX(price_per_unit), 2) as max_price
-            FROM items
-            GROUP BY name
-            ORDER BY purchase_count DESC, total_spent DESC
-            LIMIT ?
-        """, (limit,))
-
-        columns = ['name', 'purchase_count', 'total_quantity', 'total_spent',
-                   'avg_price_per_unit', 'min_price', 'max_price']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-
-        return results
+    items, _ = _get_item_statistics(db_path, limit, conn=conn)
+    return items
 
 
-def get_spending_by_date(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]]:
+@memoize_ttl(seconds=60)
+def get_spending_by_date(db_path: str = DEFAULT_DB_PATH, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
     """
     Get total spending grouped by date.
 
     Args:
         db_path: Path to SQLite database file
+        conn: Open connection to reuse instead of connecting to db_path
 
     Returns:
         List of dictionaries with date and spending
     """
-    with get_db_connection(db_path) as conn:
+    with _use_connection(db_path, conn) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT
@@ -92,25 +282,22 @@ def get_spending_by_date(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]]
             ORDER BY date DESC
         """)
 
-        columns = ['date', 'receipt_count', 'total_spent', 'avg_receipt_amount']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
+        return [dict(row) for row in cursor]
 
-        return results
 
-
-def get_spending_by_city(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]]:
+@memoize_ttl(seconds=60)
+def get_spending_by_city(db_path: str = DEFAULT_DB_PATH, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
     """
     Get total spending grouped by city/store location.
 
     Args:
         db_path: Path to SQLite database file
+        conn: Open connection to reuse instead of connecting to db_path
 
     Returns:
         List of dictionaries with city and spending statistics
     """
-    with get_db_connection(db_path) as conn:
+    with _use_connection(db_path, conn) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT
@@ -124,25 +311,22 @@ def get_spending_by_city(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]]
             ORDER BY total_spent DESC
         """)
 
-        columns = ['city', 'store_name', 'receipt_count', 'total_spent', 'avg_receipt_amount']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-
-        return results
+        return [dict(row) for row in cursor]
 
 
-def get_spending_by_month(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]]:
+@memoize_ttl(seconds=60)
+def get_spending_by_month(db_path: str = DEFAULT_DB_PATH, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
     """
     Get total spending grouped by month.
 
     Args:
         db_path: Path to SQLite database file
+        conn: Open connection to reuse instead of connecting to db_path
 
     Returns:
         List of dictionaries with month and spending statistics
     """
-    with get_db_connection(db_path) as conn:
+    with _use_connection(db_path, conn) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT
@@ -151,112 +335,153 @@ def get_spending_by_month(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]
                 SUM(total_amount) as total_spent,
                 ROUND(AVG(total_amount), 2) as avg_receipt_amount
             FROM receipts
-            GROUP BY month
+            GROUP BY substr(date, 7, 4) || '-' || substr(date, 4, 2)
             ORDER BY substr(date, 7, 4) || '-' || substr(date, 4, 2) DESC
         """)
 
-        columns = ['month', 'receipt_count', 'total_spent', 'avg_receipt_amount']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-
-        return results
+        return [dict(row) for row in cursor]
 
 
-def print_item_statistics(db_path: str = DEFAULT_DB_PATH, limit: int = 20):
+def print_item_statistics(db_path: str = DEFAULT_DB_PATH, limit: int = 20, conn: Optional[sqlite3.Connection] = None):
     """
     Print a formatted report of most purchased items.
 
     Args:
         db_path: Path to SQLite database file
         limit: Number of top items to show
+        conn: Open connection to reuse instead of connecting to db_path
     """
-    items = get_most_purchased_items(db_path, limit)
+    items, totals = _get_item_statistics(db_path, limit, conn=conn)
+    _write_lines(_format_item_statistics(items, limit, totals))
 
-    print("\n" + "=" * 100)
-    print(f"TOP {limit} MOST PURCHASED ITEMS")
-    print("=" * 100)
-    print(f"{'Item Name':<40} {'Times':<8} {'Qty':<8} {'Total €':<10} {'Avg €':<8} {'Min €':<8} {'Max €':<8}")
-    print("-" * 100)
+
+def _format_item_statistics(items: List[Dict[str, Any]], limit: int, totals: Dict[str, Any]) -> List[str]:
+    """Format the most purchased items report for already fetched rows and their totals."""
+    lines = []
+    lines.append("\n" + "=" * 100)
+    lines.append(f"TOP {limit} MOST PURCHASED ITEMS")
+    lines.append("=" * 100)
+    lines.append(f"{'Item Name':<40} {'Times':<8} {'Qty':<8} {'Total €':<10} {'Avg €':<8} {'Min €':<8} {'Max €':<8}")
+    lines.append("-" * 100)
 
     for item in items:
-        print(f"{item['name'][:40]:<40} "
-              f"{item['purchase_count']:<8} "
-              f"{item['total_quantity']:<8.1f} "
-              f"{item['total_spent']:<10.2f} "
-              f"{item['avg_price_per_unit']:<8.2f} "
-              f"{item['min_price']:<8.2f} "
-              f"{item['max_price']:<8.2f}")
+        lines.append(f"{item['name'][:40]:<40} "
+                     f"{item['purchase_count']:<8} "
+                     f"{item['total_quantity']:<8.1f} "
+                     f"{item['total_spent']:<10.2f} "
+                     f"{item['avg_price_per_unit']:<8.2f} "
+                     f"{item['min_price']:<8.2f} "
+                     f"{item['max_price']:<8.2f}")
+
+    lines.append("=" * 100)
 
-    print("=" * 100)
+    lines.append(f"\nTotal purchases (top {limit} items): {totals['total_purchases']}")
+    lines.append(f"Total spent (top {limit} items): {totals['total_spent']:.2f}€")
+    lines.append("=" * 100)
 
-    # Calculate totals
-    total_purchases = sum(item['purchase_count'] for item in items)
-    total_spent = sum(item['total_spent'] for item in items)
-    print(f"\nTotal purchases (top {limit} items): {total_purchases}")
-    print(f"Total spent (top {limit} items): {total_spent:.2f}€")
-    print("=" * 100)
+    return lines
 
 
-def print_spending_by_month(db_path: str = DEFAULT_DB_PATH):
+def print_spending_by_month(db_path: str = DEFAULT_DB_PATH, conn: Optional[sqlite3.Connection] = None):
     """
     Print a formatted report of spending by month.
 
     Args:
         db_path: Path to SQLite database file
+        conn: Open connection to reuse instead of connecting to db_path
     """
-    months = get_spending_by_month(db_path)
+    _write_lines(_format_spending_by_month(get_spending_by_month(db_path, conn=conn)))
 
-    print("\n" + "=" * 70)
-    print("SPENDING BY MONTH")
-    print("=" * 70)
-    print(f"{'Month':<15} {'Receipts':<12} {'Total Spent':<15} {'Avg/Receipt':<15}")
-    print("-" * 70)
 
+def _format_spending_by_month(months: List[Dict[str, Any]]) -> List[str]:
+    """Format the spending by month report for already fetched rows."""
+    lines = []
+    lines.append("\n" + "=" * 70)
+    lines.append("SPENDING BY MONTH")
+    lines.append("=" * 70)
+    lines.append(f"{'Month':<15} {'Receipts':<12} {'Total Spent':<15} {'Avg/Receipt':<15}")
+    lines.append("-" * 70)
+
+    # Totals are summed up while formatting, one pass over the rows
+    total_receipts = 0
+    total_spent = 0
     for month in months:
-        print(f"{month['month']:<15} "
-              f"{month['receipt_count']:<12} "
-              f"{month['total_spent']:<15.2f} "
-              f"{month['avg_receipt_amount']:<15.2f}")
-
-    print("=" * 70)
-
-    # Calculate totals
-    total_receipts = sum(m['receipt_count'] for m in months)
-    total_spent = sum(m['total_spent'] for m in months)
-    print(f"\nTotal receipts: {total_receipts}")
-    print(f"Total spent: {total_spent:.2f}€")
+        total_receipts += month['receipt_count']
+        total_spent += month['total_spent']
+        lines.append(f"{month['month']:<15} "
+                     f"{month['receipt_count']:<12} "
+                     f"{month['total_spent']:<15.2f} "
+                     f"{month['avg_receipt_amount']:<15.2f}")
+
+    lines.append("=" * 70)
+
+    lines.append(f"\nTotal receipts: {total_receipts}")
+    lines.append(f"Total spent: {total_spent:.2f}€")
     if total_receipts > 0:
-        print(f"Overall average per receipt: {total_spent/total_receipts:.2f}€")
-    print("=" * 70)
+        lines.append(f"Overall average per receipt: {total_spent/total_receipts:.2f}€")
+    lines.append("=" * 70)
+
+    return lines
 
 
-def print_spending_by_city(db_path: str = DEFAULT_DB_PATH):
+def print_spending_by_city(db_path: str = DEFAULT_DB_PATH, conn: Optional[sqlite3.Connection] = None):
     """
     Print a formatted report of spending by city/store.
 
     Args:
         db_path: Path to SQLite database file
+        conn: Open connection to reuse instead of connecting to db_path
     """
-    cities = get_spending_by_city(db_path)
+    _write_lines(_format_spending_by_city(get_spending_by_city(db_path, conn=conn)))
+
 
-    print("\n" + "=" * 90)
-    print("SPENDING BY CITY/STORE")
-    print("=" * 90)
-    print(f"{'City':<20} {'Store':<30} {'Receipts':<12} {'Total €':<12} {'Avg €':<12}")
-    print("-" * 90)
+def _format_spending_by_city(cities: List[Dict[str, Any]]) -> List[str]:
+    """Format the spending by city/store report for already fetched rows."""
+    lines = []
+    lines.append("\n" + "=" * 90)
+    lines.append("SPENDING BY CITY/STORE")
+    lines.append("=" * 90)
+    lines.append(f"{'City':<20} {'Store':<30} {'Receipts':<12} {'Total €':<12} {'Avg €':<12}")
+    lines.append("-" * 90)
 
     for city in cities:
-        print(f"{city['city'][:20]:<20} "
-              f"{city['store_name'][:30]:<30} "
-              f"{city['receipt_count']:<12} "
-              f"{city['total_spent']:<12.2f} "
-              f"{city['avg_receipt_amount']:<12.2f}")
+        lines.append(f"{city['city'][:20]:<20} "
+                     f"{city['store_name'][:30]:<30} "
+                     f"{city['receipt_count']:<12} "
+                     f"{city['total_spent']:<12.2f} "
+                     f"{city['avg_receipt_amount']:<12.2f}")
+
+    lines.append("=" * 90)
+
+    return lines
+
+
+_TOP_RECEIPTS_QUERY = """
+    SELECT
+        r.date,
+        r.time,
+        r.bon_nr,
+        r.store_name,
+        r.city,
+        r.total_amount,
+        r.payment_methode,
+        r.item_count
+    FROM receipts r
+    ORDER BY {order_clause}
+    LIMIT ?
+"""
+_TOP_BY_TOTAL_SQL = _TOP_RECEIPTS_QUERY.format(order_clause="r.total_amount DESC")
+_TOP_BY_ITEMS_SQL = _TOP_RECEIPTS_QUERY.format(order_clause="r.item_count DESC")
 
-    print("=" * 90)
+# Fixed statements per order_by value, nothing from the caller ends up in the SQL
+_TOP_RECEIPTS_SQL = {
+    'total': _TOP_BY_TOTAL_SQL,
+    'items': _TOP_BY_ITEMS_SQL,
+}
 
 
-def get_top_receipts(db_path: str = DEFAULT_DB_PATH, limit: int = 10, order_by: str = 'total') -> List[Dict[str, Any]]:
+@memoize_ttl(seconds=60)
+def get_top_receipts(db_path: str = DEFAULT_DB_PATH, limit: int = 10, order_by: str = 'total', conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
     """
     Get top receipts by total amount.
 
@@ -264,17 +489,37 @@ def get_top_receipts(db_path: str = DEFAULT_DB_PATH, limit: int = 10, order_by:
         db_path: Path to SQLite database file
         limit: Number of receipts to return
         order_by: Sort by 'total' or 'items' (item count)
+        conn: Open connection to reuse instead of connecting to db_path
 
     Returns:
         List of dictionaries with receipt information
+
+    Raises:
+        ValueError: If order_by is neither 'total' nor 'items'
     """
-    with get_db_connection(db_path) as conn:
+    if order_by not in _TOP_RECEIPTS_SQL:
+        raise ValueError(f"order_by must be one of {sorted(_TOP_RECEIPTS_SQL)}, not {order_by!r}")
+
+    with _use_connection(db_path, conn) as conn:
         cursor = conn.cursor()
+        cursor.execute(_TOP_RECEIPTS_SQL[order_by], (limit,))
+
+        return [dict(row) for row in cursor]
 
-        order_clause = "total_amount DESC" if order_by == 'total' else "item_count DESC"
 
-        cursor.execute(f"""
+def print_most_expensive_receipt(db_path: str = DEFAULT_DB_PATH, conn: Optional[sqlite3.Connection] = None):
+    """
+    Print details of the most expensive receipt.
+
+    Args:
+        db_path: Path to SQLite database file
+        conn: Open connection to reuse instead of connecting to db_path
+    """
+    with _use_connection(db_path, conn) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
             SELECT
+                r.id,
                 r.date,
                 r.time,
                 r.bon_nr,
@@ -282,98 +527,200 @@ def get_top_receipts(db_path: str = DEFAULT_DB_PATH, limit: int = 10, order_by:
                 r.city,
                 r.total_amount,
                 r.payment_methode,
-                COUNT(i.id) as item_count
+                r.item_count
             FROM receipts r
-            LEFT JOIN items i ON r.id = i.receipt_id
-            GROUP BY r.id
-            ORDER BY {order_clause}
-            LIMIT ?
-        """, (limit,))
-
-        columns = ['date', 'time', 'bon_nr', 'store_name', 'city',
-                   'total_amount', 'payment_methode', 'item_count']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-
-        return results
-
-
-def print_most_expensive_receipt(db_path: str = DEFAULT_DB_PATH):
-    """
-    Print details of the most expensive receipt.
-
-    Args:
-        db_path: Path to SQLite database file
-    """
-    receipts = get_top_receipts(db_path, limit=1, order_by='total')
-
-    if not receipts:
-        print("\nNo receipts found in database.")
-        return
+            ORDER BY r.total_amount DESC
+            LIMIT 1
+        """)
+        receipt = cursor.fetchone()
+        if receipt is None:
+            _write_lines(_format_most_expensive_receipt(None, []))
+            return
 
-    receipt = receipts[0]
-
-    print("\n" + "=" * 80)
-    print("MOST EXPENSIVE RECEIPT")
-    print("=" * 80)
-    print(f"Date:         {receipt['date']} {receipt['time']}")
-    print(f"Bon Nr:       {receipt['bon_nr']}")
-    print(f"Store:        {receipt['store_name']}")
-    print(f"City:         {receipt['city']}")
-    print(f"Payment:      {receipt['payment_methode']}")
-    print(f"Total:        {receipt['total_amount']:.2f}€")
-    print(f"Items:        {receipt['item_count']}")
-    print("-" * 80)
-
-    # Get items for this receipt
-    with get_db_connection(db_path) as conn:
-        cursor = conn.cursor()
+        # Get items for this receipt
         cursor.execute("""
             SELECT name, quantity, price_per_unit, total
             FROM items
-            WHERE date = ? AND time = ? AND receipt_id IN (
-                SELECT id FROM receipts WHERE bon_nr = ?
-            )
+            WHERE receipt_id = ?
             ORDER BY total DESC
-        """, (receipt['date'], receipt['time'], receipt['bon_nr']))
+        """, (receipt['id'],))
+        items = [dict(row) for row in cursor]
+
+    _write_lines(_format_most_expensive_receipt(dict(receipt), items))
+
+
+def _format_most_expensive_receipt(receipt: Optional[Dict[str, Any]], items: List[Dict[str, Any]]) -> List[str]:
+    """Format the most expensive receipt report, receipt is None if there are no receipts."""
+    if receipt is None:
+        return ["\nNo receipts found in database."]
+
+    lines = []
+    lines.append("\n" + "=" * 80)
+    lines.append("MOST EXPENSIVE RECEIPT")
+    lines.append("=" * 80)
+    lines.append(f"Date:         {receipt['date']} {receipt['time']}")
+    lines.append(f"Bon Nr:       {receipt['bon_nr']}")
+    lines.append(f"Store:        {receipt['store_name']}")
+    lines.append(f"City:         {receipt['city']}")
+    lines.append(f"Payment:      {receipt['payment_methode']}")
+    lines.append(f"Total:        {receipt['total_amount']:.2f}€")
+    lines.append(f"Items:        {receipt['item_count']}")
+    lines.append("-" * 80)
+
+    lines.append("ITEMS:")
+    lines.append(f"{'Name':<45} {'Qty':<8} {'Price/Unit':<12} {'Total':<10}")
+    lines.append("-" * 80)
 
-        print("ITEMS:")
-        print(f"{'Name':<45} {'Qty':<8} {'Price/Unit':<12} {'Total':<10}")
-        print("-" * 80)
+    for item in items:
+        lines.append(f"{item['name'][:45]:<45} "
+                     f"{item['quantity']:<8.1f} "
+                     f"{item['price_per_unit']:<12.2f} "
+                     f"{item['total']:<10.2f}")
 
-        for row in cursor.fetchall():
-            name, qty, price_per_unit, total = row
-            print(f"{name[:45]:<45} {qty:<8.1f} {price_per_unit:<12.2f} {total:<10.2f}")
+    lines.append("=" * 80)
 
-    print("=" * 80)
+    return lines
 
 
-def print_top_receipts(db_path: str = DEFAULT_DB_PATH, limit: int = 10):
+def print_top_receipts(db_path: str = DEFAULT_DB_PATH, limit: int = 10, conn: Optional[sqlite3.Connection] = None):
     """
     Print a formatted table of top receipts by amount.
 
     Args:
         db_path: Path to SQLite database file
         limit: Number of top receipts to show
+        conn: Open connection to reuse instead of connecting to db_path
     """
-    receipts = get_top_receipts(db_path, limit, order_by='total')
+    _write_lines(_format_top_receipts(get_top_receipts(db_path, limit, order_by='total', conn=conn), limit))
+
 
-    print("\n" + "=" * 90)
-    print(f"TOP {limit} MOST EXPENSIVE RECEIPTS")
-    print("=" * 90)
-    print(f"{'Date':<12} {'Time':<8} {'Bon':<8} {'Store':<25} {'Items':<8} {'Total €':<10}")
-    print("-" * 90)
+def _format_top_receipts(receipts: List[Dict[str, Any]], limit: int) -> List[str]:
+    """Format the top receipts report for already fetched rows."""
+    lines = []
+    lines.append("\n" + "=" * 90)
+    lines.append(f"TOP {limit} MOST EXPENSIVE RECEIPTS")
+    lines.append("=" * 90)
+    lines.append(f"{'Date':<12} {'Time':<8} {'Bon':<8} {'Store':<25} {'Items':<8} {'Total €':<10}")
+    lines.append("-" * 90)
 
     for receipt in receipts:
-        print(f"{receipt['date']:<12} "
-              f"{receipt['time']:<8} "
-              f"{receipt['bon_nr']:<8} "
-              f"{receipt['store_name'][:25]:<25} "
-              f"{receipt['item_count']:<8} "
-              f"{receipt['total_amount']:<10.2f}")
+        lines.append(f"{receipt['date']:<12} "
+                     f"{receipt['time']:<8} "
+                     f"{receipt['bon_nr']:<8} "
+                     f"{receipt['store_name'][:25]:<25} "
+                     f"{receipt['item_count']:<8} "
+                     f"{receipt['total_amount']:<10.2f}")
+
+    lines.append("=" * 90)
+
+    return lines
+
+
+# All reports of print_all_statistics in one statement. Every report row is a
+# (kind, pos, JSON object) triple, pos keeps the report's own order.
+_ALL_STATISTICS_SQL = f"""
+WITH
+top_receipt AS (
+    SELECT id, date, time, bon_nr, store_name, city, total_amount, payment_methode, item_count
+    FROM receipts
+    ORDER BY total_amount DESC
+    LIMIT 1
+),
+top_receipts AS (
+    SELECT date, time, bon_nr, store_name, city, total_amount, payment_methode, item_count
+    FROM receipts
+    ORDER BY total_amount DESC
+    LIMIT :top_receipts
+),
+{_TOP_ITEMS_CTE},
+by_month AS (
+    SELECT
+        substr(date, 4, 7) as month,
+        substr(date, 7, 4) || '-' || substr(date, 4, 2) as month_key,
+        COUNT(*) as receipt_count,
+        SUM(total_amount) as total_spent,
+        ROUND(AVG(total_amount), 2) as avg_receipt_amount
+    FROM receipts
+    GROUP BY substr(date, 7, 4) || '-' || substr(date, 4, 2)
+),
+by_city AS (
+    SELECT
+        city,
+        store_name,
+        COUNT(*) as receipt_count,
+        SUM(total_amount) as total_spent,
+        ROUND(AVG(total_amount), 2) as avg_receipt_amount
+    FROM receipts
+    GROUP BY city, store_name
+)
+SELECT 'most_expensive' AS kind, 1 AS pos,
+       json_object('date', date, 'time', time, 'bon_nr', bon_nr, 'store_name', store_name,
+                   'city', city, 'total_amount', total_amount, 'payment_methode', payment_methode,
+                   'item_count', item_count) AS report_row
+FROM top_receipt
+UNION ALL
+SELECT 'most_expensive_items', ROW_NUMBER() OVER (ORDER BY total DESC),
+       json_object('name', name, 'quantity', quantity, 'price_per_unit', price_per_unit,
+                   'total', total)
+FROM items
+WHERE receipt_id = (SELECT id FROM top_receipt)
+UNION ALL
+SELECT 'top_receipts', ROW_NUMBER() OVER (ORDER BY total_amount DESC),
+       json_object('date', date, 'time', time, 'bon_nr', bon_nr, 'store_name', store_name,
+                   'city', city, 'total_amount', total_amount, 'payment_methode', payment_methode,
+                   'item_count', item_count)
+FROM top_receipts
+UNION ALL
+SELECT 'items', ROW_NUMBER() OVER (ORDER BY purchase_count DESC, total_spent DESC),
+       json_object('name', name, 'purchase_count', purchase_count, 'total_quantity', total_quantity,
+                   'total_spent', total_spent, 'avg_price_per_unit', avg_price_per_unit,
+                   'min_price', min_price, 'max_price', max_price)
+FROM top_items
+UNION ALL
+SELECT 'item_totals', 1,
+       json_object('total_purchases', COALESCE(SUM(purchase_count), 0),
+                   'total_spent', COALESCE(SUM(total_spent), 0))
+FROM top_items
+UNION ALL
+SELECT 'by_month', ROW_NUMBER() OVER (ORDER BY month_key DESC),
+       json_object('month', month, 'receipt_count', receipt_count, 'total_spent', total_spent,
+                   'avg_receipt_amount', avg_receipt_amount)
+FROM by_month
+UNION ALL
+SELECT 'by_city', ROW_NUMBER() OVER (ORDER BY total_spent DESC),
+       json_object('city', city, 'store_name', store_name, 'receipt_count', receipt_count,
+                   'total_spent', total_spent, 'avg_receipt_amount', avg_receipt_amount)
+FROM by_city
+ORDER BY kind, pos
+"""
 
-    print("=" * 90)
+
+@memoize_ttl(seconds=60)
+def get_all_statistics(db_path: str = DEFAULT_DB_PATH, top_items: int = 20, top_receipts: int = 10,
+                       conn: Optional[sqlite3.Connection] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get the data of all reports printed by print_all_statistics with a single query.
+
+    Args:
+        db_path: Path to SQLite database file
+        top_items: Number of top items to return
+        top_receipts: Number of top receipts to return
+        conn: Open connection to reuse instead of connecting to db_path
+
+    Returns:
+        Dictionary of report rows by report: 'most_expensive', 'most_expensive_items',
+        'top_receipts', 'items', 'item_totals', 'by_month' and 'by_city'
+    """
+    reports = {kind: [] for kind in ('most_expensive', 'most_expensive_items', 'top_receipts',
+                                     'items', 'item_totals', 'by_month', 'by_city')}
+
+    with _use_connection(db_path, conn) as conn:
+        cursor = conn.cursor()
+        cursor.execute(_ALL_STATISTICS_SQL, {'top_items': top_items, 'top_receipts': top_receipts})
+        for kind, _, report_row in cursor:
+            reports[kind].append(json.loads(report_row))
+
+    return reports
 
 
 def print_all_statistics(db_path: str = DEFAULT_DB_PATH, top_items: int = 20):
@@ -384,13 +731,18 @@ def print_all_statistics(db_path: str = DEFAULT_DB_PATH, top_items: int = 20):
         db_path: Path to SQLite database file
         top_items: Number of top items to show
     """
-    print_most_expensive_receipt(db_path)
-    print_top_receipts(db_path, limit=10)
-    print_item_statistics(db_path, top_items)
-    print_spending_by_month(db_path)
-    print_spending_by_city(db_path)
+    # One query for all reports, so they all see the same data
+    reports = get_all_statistics(db_path, top_items, top_receipts=10)
+
+    most_expensive = reports['most_expensive']
+    _write_lines(_format_most_expensive_receipt(most_expensive[0] if most_expensive else None,
+                                                reports['most_expensive_items'])
+                 + _format_top_receipts(reports['top_receipts'], 10)
+                 + _format_item_statistics(reports['items'], top_items, reports['item_totals'][0])
+                 + _format_spending_by_month(reports['by_month'])
+                 + _format_spending_by_city(reports['by_city']))
 
 
 if __name__ == "__main__":
     # Run all statistics when script is executed directly
-    print_all_statistics()
\ No newline at end of file
+    print_all_statistics()
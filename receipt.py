@@ -1,15 +1,44 @@
 import re
 
+# Patterns used by Receipt.from_text, compiled once at import
+_CITY_RE = re.compile(r'(\d{5})\s+(.+)')
+_UID_RE = re.compile(r'UID Nr\.: (DE\d+)')
+_ITEM_RE = re.compile(r'^(.+?)\s+(\d+,\d{2})\s+[A-B](?:\s+\*)?$')
+_QTY_RE = re.compile(r'^\s*(\d+)\s+Stk\s+x\s+(\d+,\d{2})$')
+_TOTAL_RE = re.compile(r'SUMME\s+EUR\s+(\d+,\d{2})')
+_PAYMENT_RE = re.compile(r'Geg\. (BAR|EC-KARTE|KARTE)\s+EUR\s+(\d+,\d{2})')
+_CHANGE_RE = re.compile(r'Rückgeld (?:BAR|EC-KARTE|KARTE)?\s+EUR\s+(\d+,\d{2})')
+_TAX_RE = re.compile(r'Gesamtbetrag\s+[\d,]+\s+([\d,]+)\s+[\d,]+')
+_DATETIME_RE = re.compile(r'(\d{2}\.\d{2}\.\d{4})\s+(\d{2}:\d{2})\s+Bon-Nr\.:(\d+)')
+
+
+def _parse_eur(amount: str) -> int:
+    """Parse a receipt amount like '12,34' into integer cents."""
+    return int(round(float(amount.replace(',', '.')) * 100))
+
+
+def to_cents(euros: float) -> int:
+    """Convert a euro amount, as stored in the database, into integer cents."""
+    return int(round(euros * 100))
+
+
+def to_euros(cents: int) -> float:
+    """Convert integer cents into a euro amount, as stored in the database."""
+    return cents / 100
+
+
 class Item:
-    def __init__(self, name: str, price_per_unit: float= 0.0, quantity: float = 1.0, total: float=0.0):
+    __slots__ = ('name', 'price_per_unit', 'quantity', 'total')
+
+    def __init__(self, name: str, price_per_unit: int = 0, quantity: float = 1.0, total: int = 0):
         """
         Initialize a receipt item.
         
         Args:
             name: Product name
-            price_per_unit: Price per single unit
+            price_per_unit: Price per single unit in cents
             quantity: Number of units (default: 1)
-            discount: Discount amount in EUR (default: 0.0)
+            total: Total price of the item in cents
         """
         self.name = name
         self.price_per_unit = price_per_unit
@@ -20,39 +49,42 @@ class Item:
         (count_string,price_string) = line.strip().split("Stk x")
         count_string=count_string.strip()
         quantity = float(count_string)
-        price_string=price_string.strip().replace(',','.')
-        self.price_per_unit=float(price_string)
+        self.quantity = quantity
+        self.price_per_unit = _parse_eur(price_string.strip())
         
-        # verify 
-        if quantity * self.price_per_unit != self.total:
-            print("Inconsistency with item {name}")
-            print('quantity {quantity} and price per unit {price_per_unit} dont equal total {total}')
+        # verify, exact since all amounts are in cents
+        if self.get_calculated_total() != self.total:
+            print(f"Inconsistency with item {self.name}")
+            print(f'quantity {quantity} and price per unit {to_euros(self.price_per_unit):.2f} dont equal total {to_euros(self.total):.2f}')
     
-    def get_calculated_total(self) -> float:
-        """Calculate total based on quantity and price per unit."""
-        return self.quantity * self.price_per_unit
+    def get_calculated_total(self) -> int:
+        """Calculate total in cents based on quantity and price per unit."""
+        return round(self.quantity * self.price_per_unit)
     
     def __repr__(self) -> str:
-        return f"Item('{self.name}', {self.quantity}x {self.price_per_unit:.2f}€ = {self.total:.2f}€)"
+        return f"Item('{self.name}', {self.quantity}x {to_euros(self.price_per_unit):.2f}€ = {to_euros(self.total):.2f}€)"
     
 class Receipt:
+    __slots__ = ('store_name', 'address', 'city', 'uid_nr', 'items', 'total_amount', 'change',
+                 'payment_methode', 'taxes', 'date', 'time', 'bon_nr', 'amount_given')
+
     def __init__(self,
                  store_name: str = "",
                  address: str = "",
                  city: str = "",
                  uid_nr: str = "",
                  items: list[Item] = None,
-                 total_amount: float = 0.0,
-                 change: float = 0.0,
+                 total_amount: int = 0,
+                 change: int = 0,
                  payment_methode: str = "",
-                 taxes: float = 0.0,
+                 taxes: int = 0,
                  date: str = "",
                  time: str = "",
                  bon_nr: str = "",
-                 amount_given: float = 0.0
+                 amount_given: int = 0
                  ):
         """
-        Initialize a receipt.
+        Initialize a receipt. All amounts are in integer cents.
 
         Args:
             store_name: Name of the REWE store
@@ -83,55 +115,77 @@ class Receipt:
         self.bon_nr = bon_nr
         self.amount_given = amount_given
 
-    def get_calculated_total(self) -> float:
-        """Calculate the sum of all item totals."""
+    def to_rows(self) -> tuple[tuple, list[tuple]]:
+        """
+        Build the database rows for this receipt.
+
+        Returns:
+            tuple: (receipt_row, item_rows) in the column order of the receipts and
+                items tables, with amounts in euros. The item rows don't include the
+                receipt_id, which is only known after the receipt row was inserted.
+        """
+        receipt_row = (
+            self.store_name,
+            self.address,
+            self.city,
+            self.uid_nr,
+            to_euros(self.total_amount),
+            to_euros(self.change),
+            self.payment_methode,
+            to_euros(self.taxes),
+            self.date,
+            self.time,
+            self.bon_nr,
+            to_euros(self.amount_given),
+            len(self.items)
+        )
+        item_rows = [(item.name, to_euros(item.price_per_unit), item.quantity, to_euros(item.total),
+                      self.date, self.time)
+                     for item in self.items]
+        return receipt_row, item_rows
+
+    def get_calculated_total(self) -> int:
+        """Calculate the sum of all item totals in cents."""
         return sum(item.total for item in self.items)
 
-    def validate_total(self) -> tuple[bool, float]:
+    def validate_total(self) -> tuple[bool, int]:
         """
         Validate that the total_amount matches the sum of all items.
 
         Returns:
-            tuple: (is_valid, difference) where difference = total_amount - calculated_total
+            tuple: (is_valid, difference) where difference = total_amount - calculated_total in cents
         """
-        calculated = self.get_calculated_total()
-        difference = round(self.total_amount - calculated, 2)
-        is_valid = abs(difference) < 0.01  # Allow for small floating point errors
-        return is_valid, difference
+        difference = self.total_amount - self.get_calculated_total()
+        return difference == 0, difference
 
     def __repr__(self) -> str:
         is_valid, diff = self.validate_total()
-        validation_status = "✓" if is_valid else f"✗ (diff: {diff:.2f}€)"
-
-        lines = []
-        lines.append("=" * 60)
-        lines.append(f"RECEIPT - {self.store_name}")
-        lines.append("=" * 60)
-        lines.append(f"Address:        {self.address}")
-        lines.append(f"City:           {self.city}")
-        lines.append(f"UID Nr:         {self.uid_nr}")
-        lines.append(f"Date:           {self.date} {self.time}")
-        lines.append(f"Bon Nr:         {self.bon_nr}")
-        lines.append("-" * 60)
-        lines.append("ITEMS:")
-        lines.append("-" * 60)
-
-        for item in self.items:
-            if item.quantity == 1.0:
-                lines.append(f"  {item.name:40s} {item.total:>6.2f}€")
-            else:
-                lines.append(f"  {item.name:40s} {item.total:>6.2f}€")
-                lines.append(f"    ({item.quantity:.0f} x {item.price_per_unit:.2f}€)")
-
-        lines.append("-" * 60)
-        lines.append(f"TOTAL:          {self.total_amount:>6.2f}€ {validation_status}")
-        lines.append(f"Payment:        {self.payment_methode:>6s} {self.amount_given:>6.2f}€")
-        if self.change > 0:
-            lines.append(f"Change:         {self.change:>13.2f}€")
-        lines.append(f"Taxes:          {self.taxes:>13.2f}€")
-        lines.append("=" * 60)
-
-        return "\n".join(lines)
+        validation_status = "✓" if is_valid else f"✗ (diff: {to_euros(diff):.2f}€)"
+
+        items = "".join(
+            f"  {item.name:40s} {to_euros(item.total):>6.2f}€\n"
+            + (f"    ({item.quantity:.0f} x {to_euros(item.price_per_unit):.2f}€)\n" if item.quantity != 1.0 else "")
+            for item in self.items)
+        change = f"Change:         {to_euros(self.change):>13.2f}€\n" if self.change > 0 else ""
+
+        return (f"{'=' * 60}\n"
+                f"RECEIPT - {self.store_name}\n"
+                f"{'=' * 60}\n"
+                f"Address:        {self.address}\n"
+                f"City:           {self.city}\n"
+                f"UID Nr:         {self.uid_nr}\n"
+                f"Date:           {self.date} {self.time}\n"
+                f"Bon Nr:         {self.bon_nr}\n"
+                f"{'-' * 60}\n"
+                f"ITEMS:\n"
+                f"{'-' * 60}\n"
+                f"{items}"
+                f"{'-' * 60}\n"
+                f"TOTAL:          {to_euros(self.total_amount):>6.2f}€ {validation_status}\n"
+                f"Payment:        {self.payment_methode:>6s} {to_euros(self.amount_given):>6.2f}€\n"
+                f"{change}"
+                f"Taxes:          {to_euros(self.taxes):>13.2f}€\n"
+                f"{'=' * 60}")
 
     @classmethod
     def from_text(cls, text: str) -> 'Receipt':
@@ -160,33 +214,31 @@ class Receipt:
         address = address_line1
 
         # Extract city from address line (format: "postal_code city")
-        city_match = re.search(r'(\d{5})\s+(.+)', address_line2)
+        city_match = _CITY_RE.search(address_line2)
         city = city_match.group(2).strip() if city_match else ""
 
         # Parse UID
-        uid_match = re.search(r'UID Nr\.: (DE\d+)', text)
+        uid_match = _UID_RE.search(text)
         uid_nr = uid_match.group(1) if uid_match else ""
 
         # Parse items (lines with product name, price, and tax category)
         items = []
-        item_pattern = r'^(.+?)\s+(\d+,\d{2})\s+[A-B](?:\s+\*)?$'
-        quantity_pattern = r'^\s*(\d+)\s+Stk\s+x\s+(\d+,\d{2})$'
 
         i = 0
         while i < len(non_empty_lines):
             line = non_empty_lines[i]
-            match = re.match(item_pattern, line)
+            match = _ITEM_RE.match(line)
             if match:
                 name = match.group(1).strip()
-                total = float(match.group(2).replace(',', '.'))
+                total = _parse_eur(match.group(2))
 
                 # Check if next line has quantity info
                 if i + 1 < len(non_empty_lines):
                     next_line = non_empty_lines[i + 1]
-                    qty_match = re.match(quantity_pattern, next_line)
+                    qty_match = _QTY_RE.match(next_line)
                     if qty_match:
                         quantity = float(qty_match.group(1))
-                        price_per_unit = float(qty_match.group(2).replace(',', '.'))
+                        price_per_unit = _parse_eur(qty_match.group(2))
                         items.append(Item(name=name, quantity=quantity, price_per_unit=price_per_unit, total=total))
                         i += 2  # Skip the next line since we processed it
                         continue
@@ -196,24 +248,24 @@ class Receipt:
             i += 1
 
         # Parse total amount
-        total_match = re.search(r'SUMME\s+EUR\s+(\d+,\d{2})', text)
-        total_amount = float(total_match.group(1).replace(',', '.')) if total_match else 0.0
+        total_match = _TOTAL_RE.search(text)
+        total_amount = _parse_eur(total_match.group(1)) if total_match else 0
 
         # Parse payment method and amount given
-        payment_match = re.search(r'Geg\. (BAR|EC-KARTE|KARTE)\s+EUR\s+(\d+,\d{2})', text)
+        payment_match = _PAYMENT_RE.search(text)
         payment_methode = payment_match.group(1) if payment_match else ""
-        amount_given = float(payment_match.group(2).replace(',', '.')) if payment_match else 0.0
+        amount_given = _parse_eur(payment_match.group(2)) if payment_match else 0
 
         # Parse change
-        change_match = re.search(r'Rückgeld (?:BAR|EC-KARTE|KARTE)?\s+EUR\s+(\d+,\d{2})', text)
-        change = float(change_match.group(1).replace(',', '.')) if change_match else 0.0
+        change_match = _CHANGE_RE.search(text)
+        change = _parse_eur(change_match.group(1)) if change_match else 0
 
         # Parse taxes
-        tax_match = re.search(r'Gesamtbetrag\s+[\d,]+\s+([\d,]+)\s+[\d,]+', text)
-        taxes = float(tax_match.group(1).replace(',', '.')) if tax_match else 0.0
+        tax_match = _TAX_RE.search(text)
+        taxes = _parse_eur(tax_match.group(1)) if tax_match else 0
 
         # Parse date, time, and bon number
-        date_time_match = re.search(r'(\d{2}\.\d{2}\.\d{4})\s+(\d{2}:\d{2})\s+Bon-Nr\.:(\d+)', text)
+        date_time_match = _DATETIME_RE.search(text)
         date = date_time_match.group(1) if date_time_match else ""
         time = date_time_match.group(2) if date_time_match else ""
         bon_nr = date_time_match.group(3) if date_time_match else ""
@@ -0,0 +1,177 @@
+"""
+Schema Migrations for REWE Receipt Analyzer
+
+Brings databases created by older versions up to the current schema and creates
+the indexes the statistics queries rely on. Applied by the database module when
+it opens a file, the query module only reads.
+"""
+
+import sqlite3
+from typing import Callable
+
+
+# Adds the item_count column to databases created before it existed
+_ADD_ITEM_COUNT = """
+ALTER TABLE receipts ADD COLUMN item_count INTEGER;
+UPDATE receipts SET item_count = (SELECT COUNT(*) FROM items WHERE receipt_id = receipts.id);
+"""
+
+# Creates the item_stats summary table, kept in sync with items by triggers,
+# and fills it from the existing items
+_ADD_ITEM_STATS = """
+CREATE TABLE item_stats (
+    name TEXT PRIMARY KEY,
+    purchase_count INTEGER NOT NULL,
+    total_quantity REAL,
+    total_spent REAL,
+    price_sum REAL,
+    min_price REAL,
+    max_price REAL
+);
+CREATE INDEX idx_item_stats_top ON item_stats(purchase_count DESC, total_spent DESC);
+
+CREATE TRIGGER trg_item_stats_insert AFTER INSERT ON items WHEN NEW.name IS NOT NULL
+BEGIN
+    INSERT INTO item_stats (name, purchase_count, total_quantity, total_spent, price_sum, min_price, max_price)
+    VALUES (NEW.name, 1, NEW.quantity, NEW.total, NEW.price_per_unit, NEW.price_per_unit, NEW.price_per_unit)
+    ON CONFLICT (name) DO UPDATE SET
+        purchase_count = purchase_count + 1,
+        total_quantity = total_quantity + excluded.total_quantity,
+        total_spent = total_spent + excluded.total_spent,
+        price_sum = price_sum + excluded.price_sum,
+        min_price = MIN(min_price, excluded.min_price),
+        max_price = MAX(max_price, excluded.max_price);
+END;
+
+-- MIN/MAX can't be undone incrementally, recompute the affected names instead
+CREATE TRIGGER trg_item_stats_delete AFTER DELETE ON items
+BEGIN
+    DELETE FROM item_stats WHERE name = OLD.name;
+    INSERT INTO item_stats
+    SELECT name, COUNT(*), SUM(quantity), SUM(total),
+           SUM(price_per_unit), MIN(price_per_unit), MAX(price_per_unit)
+    FROM items WHERE name = OLD.name GROUP BY name;
+END;
+
+CREATE TRIGGER trg_item_stats_update AFTER UPDATE OF name, price_per_unit, quantity, total ON items
+BEGIN
+    DELETE FROM item_stats WHERE name IN (OLD.name, NEW.name);
+    INSERT INTO item_stats
+    SELECT name, COUNT(*), SUM(quantity), SUM(total),
+           SUM(price_per_unit), MIN(price_per_unit), MAX(price_per_unit)
+    FROM items WHERE name IN (OLD.name, NEW.name) GROUP BY name;
+END;
+
+INSERT INTO item_stats
+SELECT name, COUNT(*), SUM(quantity), SUM(total),
+       SUM(price_per_unit), MIN(price_per_unit), MAX(price_per_unit)
+FROM items WHERE name IS NOT NULL GROUP BY name;
+"""
+
+
+# Indexes backing the GROUP BY / ORDER BY columns of the queries module
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_items_name ON items(name);
+CREATE INDEX IF NOT EXISTS idx_items_receipt_id ON items(receipt_id);
+CREATE INDEX IF NOT EXISTS idx_receipts_date ON receipts(date, total_amount);
+CREATE INDEX IF NOT EXISTS idx_receipts_city_store ON receipts(city, store_name);
+CREATE INDEX IF NOT EXISTS idx_receipts_total ON receipts(total_amount);
+
+-- Must match the month key in get_spending_by_month exactly
+CREATE INDEX IF NOT EXISTS idx_receipts_month
+    ON receipts(substr(date, 7, 4) || '-' || substr(date, 4, 2));
+"""
+
+
+def migrate(conn: sqlite3.Connection) -> bool:
+    """
+    Bring a database created by an older version up to the current schema.
+
+    Args:
+        conn: Open database connection in autocommit mode (isolation_level=None),
+              without a pending transaction
+
+    Returns:
+        bool: True if the schema was changed, pass it on to ensure_indexes()
+    """
+    migrated = False
+
+    if _item_count_missing(conn):
+        migrated |= _apply(conn, _item_count_missing, _ADD_ITEM_COUNT)
+
+    if _item_stats_missing(conn):
+        migrated |= _apply(conn, _item_stats_missing, _ADD_ITEM_STATS)
+
+    return migrated
+
+
+def _apply(conn: sqlite3.Connection, is_missing: Callable[[sqlite3.Connection], bool], script: str) -> bool:
+    """
+    Run a migration script in one write transaction if it is still needed.
+
+    The check is repeated after taking the write lock, another process may
+    have migrated the database in the meantime.
+
+    Args:
+        conn: Open database connection in autocommit mode
+        is_missing: Function telling whether the connection still needs the migration
+        script: SQL statements of the migration, without transaction control
+
+    Returns:
+        bool: True if the script was run
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        applied = is_missing(conn)
+        if applied:
+            # executescript() would commit first, so run the statements one by one
+            statement = ""
+            for line in script.splitlines(keepends=True):
+                statement += line
+                if sqlite3.complete_statement(statement):
+                    conn.execute(statement)
+                    statement = ""
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:  # Some errors already roll back
+            conn.execute("ROLLBACK")
+        raise
+    return applied
+
+
+def _item_count_missing(conn: sqlite3.Connection) -> bool:
+    """Whether the receipts table lacks the item_count column."""
+    return 'item_count' not in {row[1] for row in conn.execute("PRAGMA table_info(receipts)")}
+
+
+def _item_stats_missing(conn: sqlite3.Connection) -> bool:
+    """Whether the database lacks the item_stats summary table."""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_stats'").fetchone() is None
+
+
+def ensure_indexes(conn: sqlite3.Connection, analyze: bool = False):
+    """
+    Create the indexes used by the statistics queries if they are missing.
+
+    Runs ANALYZE if an index was created or the database has no planner
+    statistics yet, later changes are picked up by PRAGMA optimize when the
+    writer closes the database.
+
+    Args:
+        conn: Open database connection
+        analyze: Run ANALYZE anyway, e.g. after migrate() changed the schema
+    """
+    existing = _index_names(conn)
+    conn.executescript(_INDEXES)
+    if analyze or _index_names(conn) != existing or not _has_statistics(conn):
+        conn.execute("ANALYZE")
+
+
+def _index_names(conn: sqlite3.Connection) -> set:
+    """Names of all indexes in the database."""
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def _has_statistics(conn: sqlite3.Connection) -> bool:
+    """Whether ANALYZE has been run on the database."""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone() is not None